@@ -0,0 +1,118 @@
+import dataclasses
+import re
+
+from django.core.validators import ProhibitNullCharactersValidator
+from rest_framework import serializers
+from rest_framework.fields import empty
+from rest_framework.validators import ProhibitSurrogateCharactersValidator
+
+_FIELD_CLASSES = {
+    int: serializers.IntegerField,
+    float: serializers.FloatField,
+    str: serializers.CharField,
+    bool: serializers.BooleanField,
+}
+_CHAR_VALIDATORS = (ProhibitNullCharactersValidator, ProhibitSurrogateCharactersValidator)
+_SURROGATES = re.compile('[\ud800-\udfff]')
+
+
+class FallbackValidation(Exception):
+    pass
+
+
+class MissingRequiredFields(FallbackValidation):
+    def __init__(self, fields):
+        super(MissingRequiredFields, self).__init__(fields)
+        self.fields = fields
+
+
+def _coerce_str(value):
+    if value.__class__ not in (str, int, float):
+        raise FallbackValidation
+    value = str(value).strip()
+    if not value or '\x00' in value or (not value.isascii() and _SURROGATES.search(value)):
+        raise FallbackValidation
+    return value
+
+
+def _coerce_float(value):
+    if value.__class__ is str and len(value) > serializers.FloatField.MAX_STRING_LENGTH:
+        raise FallbackValidation
+    return float(value)
+
+
+def _coerce_int(value):
+    if value.__class__ is not int:
+        raise FallbackValidation
+    return value
+
+
+def _coerce_bool(value):
+    if value in serializers.BooleanField.TRUE_VALUES:
+        return True
+    if value in serializers.BooleanField.FALSE_VALUES:
+        return False
+    raise FallbackValidation
+
+
+_COERCERS = {int: _coerce_int, float: _coerce_float, str: _coerce_str, bool: _coerce_bool}
+
+
+def build_dataclass_validator(dataclass):
+    """
+    Generate a function which validates a plain dict of primitive values into the dataclass.
+    It raises FallbackValidation (or TypeError/ValueError) for anything it does not handle,
+    the serializer then validates the data as usual and reports the errors.
+    MissingRequiredFields is raised only when every present value is valid.
+    """
+    if not dataclasses.is_dataclass(dataclass):
+        return None
+    dataclass_fields = dataclasses.fields(dataclass)
+    if any(v.type not in _COERCERS or not v.init for v in dataclass_fields):
+        return None
+    namespace = {'_dataclass': dataclass, '_empty': empty, '_Missing': MissingRequiredFields}
+    lines = ['def validate(data):', '    missing = []']
+    for i, field in enumerate(dataclass_fields):
+        namespace[f'_coerce_{i}'] = _COERCERS[field.type]
+        lines.append(f'    if {field.name!r} in data:')
+        lines.append(f'        v_{i} = _coerce_{i}(data[{field.name!r}])')
+        lines.append('    else:')
+        if _is_required(field):
+            lines.append(f'        missing.append({field.name!r})')
+        else:
+            lines.append(f'        v_{i} = _empty')
+    lines.append('    if missing:')
+    lines.append('        raise _Missing(missing)')
+    arguments = ', '.join(f'{field.name}=v_{i}' for i, field in enumerate(dataclass_fields))
+    lines.append(f'    return _dataclass({arguments})')
+    exec(compile('\n'.join(lines), f'<air dataclass validator {dataclass.__qualname__}>', 'exec'), namespace)
+    return namespace['validate']
+
+
+def is_validator_compatible(serializer, dataclass) -> bool:
+    dataclass_fields = dataclasses.fields(dataclass)
+    writable_fields = {v.field_name: v for v in serializer._writable_fields}
+    if set(writable_fields) != {v.name for v in dataclass_fields}:
+        return False
+    for dataclass_field in dataclass_fields:
+        field = writable_fields[dataclass_field.name]
+        if type(field) is not _FIELD_CLASSES[dataclass_field.type]:
+            return False
+        if field.source != dataclass_field.name or field.required != _is_required(dataclass_field):
+            return False
+        if field.error_messages['required'] is not serializers.Field.default_error_messages['required']:
+            return False
+        if field.allow_null or field.default is not empty or getattr(serializer, f'validate_{field.field_name}', None):
+            return False
+        if isinstance(field, serializers.CharField):
+            if field.allow_blank or not field.trim_whitespace:
+                return False
+            if not all(isinstance(v, _CHAR_VALIDATORS) for v in field.validators):
+                return False
+        elif field.validators:
+            return False
+    return True
+
+
+def _is_required(field) -> bool:
+    return field.default is dataclasses.MISSING and field.default_factory is dataclasses.MISSING
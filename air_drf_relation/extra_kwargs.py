@@ -2,6 +2,9 @@ from copy import deepcopy
 
 from air_drf_relation.utils import create_dict_from_list
 
+# parsed "action1,action2" keys of Meta.action_* dicts, the dict itself is kept to validate the id
+_ACTION_KEYS_CACHE = {}
+
 
 class ExtraKwargsFactory:
     def __init__(self, meta, data: dict, action=None):
@@ -28,7 +31,10 @@ class ExtraKwargsFactory:
         return self
 
     def _set_extra_kwargs(self):
-        extra_kwargs_list = self._get_extra_kwargs_list()
+        self.extra_kwargs = self.merge_extra_kwargs(self._get_extra_kwargs_list())
+
+    @staticmethod
+    def merge_extra_kwargs(extra_kwargs_list) -> dict:
         extra_kwargs = dict()
         for el in extra_kwargs_list:
             for field_name, field_value in el.items():
@@ -36,7 +42,7 @@ class ExtraKwargsFactory:
                     extra_kwargs[field_name] = {**extra_kwargs[field_name], **field_value}
                 else:
                     extra_kwargs[field_name] = field_value
-        self.extra_kwargs = extra_kwargs
+        return extra_kwargs
 
     def _set_meta_extra_kwargs(self):
         if hasattr(self.Meta, 'extra_kwargs'):
@@ -47,46 +53,41 @@ class ExtraKwargsFactory:
             self.hidden_fields = create_dict_from_list(self.Meta.hidden_fields, {'hidden': True})
 
     def _set_action_hidden_fields(self):
-        if hasattr(self.Meta, 'action_hidden_fields'):
-            remain_value = None
-            _action_hidden_fields: dict = self.Meta.action_hidden_fields
-            for key, value in _action_hidden_fields.items():
-                keys = key.replace(' ', '').split(',')
-                if self.action in keys:
-                    self.action_hidden_fields = create_dict_from_list(value, {'hidden': True})
-                    return
-                if '_' in keys:
-                    remain_value = value
-            if remain_value:
-                self.action_hidden_fields = create_dict_from_list(remain_value, {'hidden': True})
+        value = self._get_action_value('action_hidden_fields')
+        if value:
+            self.action_hidden_fields = create_dict_from_list(value, {'hidden': True})
 
     def _set_action_read_only_fields(self):
-        if hasattr(self.Meta, 'action_read_only_fields'):
-            remain_value = None
-            _action_read_only_fields: dict = self.Meta.action_read_only_fields
-            for key, value in _action_read_only_fields.items():
-                keys = key.replace(' ', '').split(',')
-                if self.action in keys:
-                    self.action_read_only_fields = create_dict_from_list(value, {'read_only': True})
-                    return
-                if '_' in keys:
-                    remain_value = value
-            if remain_value:
-                self.action_read_only_fields = create_dict_from_list(remain_value, {'read_only': True})
+        value = self._get_action_value('action_read_only_fields')
+        if value:
+            self.action_read_only_fields = create_dict_from_list(value, {'read_only': True})
 
     def _set_action_extra_kwargs(self):
-        if hasattr(self.Meta, 'action_extra_kwargs'):
-            remain_value = None
-            _action_extra_kwargs: dict = self.Meta.action_extra_kwargs
-            for key, value in _action_extra_kwargs.items():
-                keys = key.replace(' ', '').split(',')
-                if self.action in keys:
-                    self.action_extra_kwargs = value
-                    return
-                if '_' in keys:
-                    remain_value = value
-            if remain_value:
-                self.action_extra_kwargs = remain_value
+        value = self._get_action_value('action_extra_kwargs')
+        if value:
+            self.action_extra_kwargs = value
+
+    def _get_action_value(self, attr_name):
+        values = getattr(self.Meta, attr_name, None)
+        if not values:
+            return None
+        by_action, remain_value = self._parse_action_keys(values)
+        return by_action[self.action] if self.action in by_action else remain_value
+
+    @staticmethod
+    def _parse_action_keys(values: dict):
+        cached = _ACTION_KEYS_CACHE.get(id(values))
+        if cached is not None and cached[0] is values:
+            return cached[1]
+        by_action, remain_value = {}, None
+        for key, value in values.items():
+            keys = key.replace(' ', '').split(',')
+            for action in keys:
+                by_action.setdefault(action, value)
+            if '_' in keys:
+                remain_value = value
+        _ACTION_KEYS_CACHE[id(values)] = (values, (by_action, remain_value))
+        return by_action, remain_value
 
     def _get_extra_kwargs_list(self) -> list[dict]:
         result = list()
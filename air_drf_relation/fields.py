@@ -1,6 +1,11 @@
-from rest_framework.relations import PrimaryKeyRelatedField, Field
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils.functional import cached_property
+from rest_framework.relations import PrimaryKeyRelatedField, ManyRelatedField, Field, MANY_RELATION_KWARGS
+from air_drf_relation.preload_objects_manager import PreloadObjectsManager
 from air_drf_relation.utils import get_pk_from_data
 
+_LIBRARY_MODULES = ('air_drf_relation', 'rest_framework', 'rest_framework_dataclasses', 'builtins')
+
 
 class AirRelatedField(PrimaryKeyRelatedField):
     def __init__(self, serializer, **kwargs):
@@ -14,7 +19,7 @@ class AirRelatedField(PrimaryKeyRelatedField):
 
         if not kwargs.get('read_only'):
             self.queryset = kwargs.pop('queryset', None)
-            if not self.queryset:
+            if self.queryset is None:
                 self.queryset = self.serializer.Meta.model.objects
         else:
             self.queryset_function_disabled = True
@@ -30,6 +35,14 @@ class AirRelatedField(PrimaryKeyRelatedField):
     def __call__(self, *args, **kwargs):
         super.__call__(*args, **kwargs)
 
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return AirManyRelatedField(**list_kwargs)
+
     def use_pk_only_optimization(self):
         return self.pk_only
 
@@ -39,11 +52,63 @@ class AirRelatedField(PrimaryKeyRelatedField):
 
     def to_representation(self, value):
         if not self.pk_only:
-            serializer = self.serializer(value, context=self.context)
-            serializer.parent = self.parent
+            serializer = self._representation_serializer
+            if serializer is None:
+                serializer = self.serializer(value, context=self.context)
+                serializer.parent = self.parent
+                return serializer.data
+            serializer.instance = value
+            serializer.__dict__.pop('_data', None)
             return serializer.data
         return value.pk
 
+    @cached_property
+    def _representation_serializer(self):
+        # one serializer is reused for every represented value of the field,
+        # unless its own __init__ or get_fields may depend on the instance
+        for klass in self.serializer.__mro__:
+            if klass.__module__.split('.')[0] in _LIBRARY_MODULES:
+                continue
+            if '__init__' in klass.__dict__ or 'get_fields' in klass.__dict__:
+                return None
+        serializer = self.serializer(context=self.context)
+        serializer.parent = self.parent
+        return serializer
+
+
+class AirManyRelatedField(ManyRelatedField):
+    def to_internal_value(self, data):
+        manager = PreloadObjectsManager.get_active_manager(self)
+        if manager and PreloadObjectsManager.hash_from_queryset(self.child_relation.queryset) in \
+                manager.preloaded_objects:
+            return super(AirManyRelatedField, self).to_internal_value(data)
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        return self._get_objects_in_bulk(list(data))
+
+    def _get_objects_in_bulk(self, data):
+        child = self.child_relation
+        pk_field = child.queryset.model._meta.pk
+        pks = []
+        for item in data:
+            value = get_pk_from_data(item, pk_field.name)
+            try:
+                pks.append(None if isinstance(value, bool) else pk_field.to_python(value))
+            except (TypeError, ValueError, DjangoValidationError):
+                pks.append(None)
+        objects = {}
+        valid_pks = [v for v in pks if v is not None]
+        if valid_pks and child.pk_field is None:
+            objects = {v.pk: v for v in child.get_queryset().filter(pk__in=valid_pks)}
+        result = []
+        for item, pk in zip(data, pks):
+            obj = objects.get(pk) if pk is not None else None
+            # missing or invalid values go through the child to raise the same errors
+            result.append(obj if obj is not None else child.to_internal_value(item))
+        return result
+
 
 class AirAnyField(Field):
     def to_representation(self, value):
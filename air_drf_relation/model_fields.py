@@ -1,15 +1,39 @@
+from typing import Union, get_args, get_origin
+
 from dacite import from_dict
 from django.db import models
-from dataclasses import asdict, is_dataclass
+from django.db.backends.base.operations import BaseDatabaseOperations
+from dataclasses import MISSING, asdict, is_dataclass, fields
 import json
+import math
 
 from django.db.models.fields.json import KeyTransform
 
+try:
+    import orjson
+
+    def _json_loads(value):
+        try:
+            return orjson.loads(value)
+        except orjson.JSONDecodeError:
+            # NaN and Infinity written by json.dumps are not accepted by orjson
+            return json.loads(value)
+
+    def _json_dumps(value):
+        return orjson.dumps(value).decode()
+except ImportError:
+    _json_loads = json.loads
+    _json_dumps = None
+
+_PRIMITIVE_TYPES = (int, str, float, bool)
+
 
 class AirDataclassField(models.JSONField):
 
     def __init__(self, data_class, *args, **kwargs):
         self.data_class = data_class
+        self._flat_field_names = self._get_flat_field_names(data_class)
+        self._from_dict = self._get_from_dict_function(data_class)
         super().__init__(*args, **kwargs)
 
     def deconstruct(self):
@@ -20,20 +44,86 @@ class AirDataclassField(models.JSONField):
     def from_db_value(self, value, expression, connection):
         if value is None:
             return value
-        obj = json.loads(value)
+        obj = _json_loads(value)
         if obj is None:
             return None
-        return from_dict(data_class=self.data_class, data=obj)
+        return self._from_dict(obj)
 
     def to_python(self, value):
         if isinstance(value, self.data_class):
             return value
         if value is None:
             return value
-        obj = json.loads(value)
-        return from_dict(data_class=self.data_class, data=obj)
+        obj = _json_loads(value)
+        return self._from_dict(obj)
 
     def get_prep_value(self, value):
         if not is_dataclass(value):
             return self._get_default()
+        if self._flat_field_names is not None and type(value) is self.data_class:
+            return {k: getattr(value, k) for k in self._flat_field_names}
         return asdict(value)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        # only flat dataclasses hold primitive values, orjson would also encode datetime or UUID values
+        # which json.dumps rejects and which could not be read back
+        if _json_dumps is None or self.encoder is not None or self._flat_field_names is None or \
+                type(value) is not self.data_class or \
+                type(connection.ops).adapt_json_value is not BaseDatabaseOperations.adapt_json_value:
+            return super().get_db_prep_value(value, connection, prepared)
+        if not prepared:
+            value = self.get_prep_value(value)
+        if _has_non_finite_float(value):
+            # orjson writes NaN and Infinity as null
+            return super().get_db_prep_value(value, connection, prepared=True)
+        try:
+            return _json_dumps(value)
+        except TypeError:
+            # orjson rejects integers above 64 bits and lone surrogates
+            return super().get_db_prep_value(value, connection, prepared=True)
+
+    def _get_from_dict_function(self, data_class):
+        if self._flat_field_names is None:
+            return lambda data: from_dict(data_class=data_class, data=data)
+        init_fields = [v for v in fields(data_class) if v.init]
+        init_field_names = tuple(v.name for v in init_fields)
+        # like dacite, missing Optional fields without a default are None
+        optional_field_names = tuple(v.name for v in init_fields if v.default is MISSING and
+                                     v.default_factory is MISSING and _is_optional_type(v.type))
+
+        def _from_dict(data):
+            kwargs = {k: data[k] for k in init_field_names if k in data}
+            for k in optional_field_names:
+                kwargs.setdefault(k, None)
+            return data_class(**kwargs)
+
+        return _from_dict
+
+    @staticmethod
+    def _get_flat_field_names(data_class):
+        if not is_dataclass(data_class):
+            return None
+        data_class_fields = fields(data_class)
+        if not all(_is_primitive_type(v.type) for v in data_class_fields):
+            return None
+        return tuple(v.name for v in data_class_fields)
+
+
+def _has_non_finite_float(value) -> bool:
+    if isinstance(value, float):
+        return not math.isfinite(value)
+    if isinstance(value, dict):
+        return any(_has_non_finite_float(v) for v in value.values())
+    return False
+
+
+def _is_optional_type(value_type) -> bool:
+    return get_origin(value_type) is Union and type(None) in get_args(value_type)
+
+
+def _is_primitive_type(value_type) -> bool:
+    if value_type in _PRIMITIVE_TYPES:
+        return True
+    if get_origin(value_type) is Union:
+        return all(v in _PRIMITIVE_TYPES or v is type(None) for v in get_args(value_type))
+    return False
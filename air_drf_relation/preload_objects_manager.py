@@ -1,12 +1,31 @@
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from itertools import islice
+import uuid
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connections
 from django.db.models import QuerySet
 from rest_framework import serializers, fields
-from hashlib import md5
 from rest_framework.relations import PrimaryKeyRelatedField
 
 from air_drf_relation import air_drf_relation_settings
 
+_current_manager = ContextVar('_current_manager', default=None)
+_INTEGER_PK_TYPES = ('AutoField', 'BigAutoField', 'SmallAutoField')
+
+
+def _prep_uuid(value):
+    if isinstance(value, uuid.UUID):
+        return value
+    return uuid.UUID(int=value) if isinstance(value, int) else uuid.UUID(value)
+
 
 class PreloadObjectsManager:
+    __slots__ = ('preloaded_objects', '_objects_for_preload', '_serializer')
+
     def __init__(self, serializer):
         self.preloaded_objects = {}
         self._objects_for_preload = {}
@@ -18,81 +37,197 @@ class PreloadObjectsManager:
         manager = PreloadObjectsManager.find_preload_objects_manager(serializer)
         return manager if manager else PreloadObjectsManager(serializer)
 
+    @staticmethod
+    @contextmanager
+    def activate(manager):
+        token = _current_manager.set(manager)
+        try:
+            yield manager
+        finally:
+            _current_manager.reset(token)
+
     def init(self):
-        if not air_drf_relation_settings.get('USE_PRELOAD'):
+        if not air_drf_relation_settings.get('USE_PRELOAD') or not self.is_search_enabled():
             return None
         self._init(self._serializer, self._serializer.initial_data)
-        for query_hash, data in self._objects_for_preload.items():
-            self.preloaded_objects[query_hash] = data['queryset'].filter(pk__in=list(set(data['pks']))) if data[
-                'pks'] else []
+        self._execute_preload_queries()
         return self
 
+    def _execute_preload_queries(self):
+        tasks = []
+        for query_hash, data in self._objects_for_preload.items():
+            self.preloaded_objects[query_hash] = {}
+            if data['pks']:
+                tasks.append((query_hash, data))
+        if air_drf_relation_settings.get('PRELOAD_PARALLEL') and len(tasks) > 1 and \
+                not self._has_atomic_block(tasks):
+            with ThreadPoolExecutor(max_workers=min(len(tasks), 4)) as executor:
+                results = list(executor.map(self._run_preload_query_in_thread, tasks))
+        else:
+            results = [self._run_preload_query(task) for task in tasks]
+        for query_hash, objects in results:
+            self.preloaded_objects[query_hash] = objects
+
+    @staticmethod
+    def _has_atomic_block(tasks):
+        # worker threads use their own connections, they can not see rows of an open transaction
+        return any(connections[data['queryset'].db].in_atomic_block for _, data in tasks)
+
+    @staticmethod
+    def _run_preload_query(task):
+        query_hash, data = task
+        queryset, pks = data['queryset'], iter(data['pks'])
+        chunk_size = air_drf_relation_settings.get('PRELOAD_CHUNK_SIZE')
+        objects = {}
+        while True:
+            chunk = list(islice(pks, chunk_size))
+            if not chunk:
+                break
+            for v in queryset.filter(pk__in=chunk):
+                objects[v.pk] = v
+        return query_hash, objects
+
+    @staticmethod
+    def _run_preload_query_in_thread(task):
+        try:
+            return PreloadObjectsManager._run_preload_query(task)
+        finally:
+            connections.close_all()
+
     def _init(self, serializer, data):
-        if not data:
-            return
-        _data = data if type(data) == list else [data]
-        current_fields = list(serializer._writable_fields)
-        for value in _data:
-            for field in current_fields:
-                field_type = type(field)
-                if issubclass(field_type, serializers.PrimaryKeyRelatedField):
-                    val = field.get_value(value) if isinstance(value, dict) else value
-                    self._append_object_pks(field.queryset, val)
-                elif issubclass(field_type, serializers.ManyRelatedField):
-                    # print(value)
-                    val = field.get_value(value)
-                    self._append_object_pks(field.child_relation.queryset, val)
-                elif issubclass(field_type, serializers.Serializer):
-                    self._init(field, value.get(field.field_name, None))
-                elif issubclass(field_type, serializers.ListSerializer) and hasattr(field, 'child'):
-                    self._init(field.child, value.get(field.field_name, None))
+        stack = deque([(serializer, data)])
+        while stack:
+            serializer, data = stack.pop()
+            if not data:
+                continue
+            _data = data if type(data) == list else [data]
+            pk_fields, many_fields, nested_fields = self._get_field_buckets(serializer)
+            for value in _data:
+                is_plain_dict = type(value) is dict
+                for field, field_name, queryset in pk_fields:
+                    if is_plain_dict:
+                        val = value.get(field_name, fields.empty)
+                    else:
+                        val = field.get_value(value) if isinstance(value, dict) else value
+                    self._append_object_pks(queryset, val)
+                for field, field_name, queryset in many_fields:
+                    val = value.get(field_name, fields.empty) if is_plain_dict else field.get_value(value)
+                    self._append_object_pks(queryset, val)
+                for field_name, child in nested_fields:
+                    stack.append((child, value.get(field_name, None)))
         return self
 
+    @staticmethod
+    def _get_field_buckets(serializer):
+        buckets = getattr(serializer, '_air_field_buckets', None)
+        if buckets is not None:
+            return buckets
+        pk_fields, many_fields, nested_fields = [], [], []
+        for field in serializer._writable_fields:
+            if isinstance(field, serializers.PrimaryKeyRelatedField):
+                queryset = getattr(field, 'queryset', None)
+                if queryset is not None:
+                    pk_fields.append((field, field.field_name, queryset))
+            elif isinstance(field, serializers.ManyRelatedField):
+                queryset = getattr(field.child_relation, 'queryset', None)
+                if queryset is not None:
+                    many_fields.append((field, field.field_name, queryset))
+            elif isinstance(field, serializers.Serializer):
+                nested_fields.append((field.field_name, field))
+            elif isinstance(field, serializers.ListSerializer) and hasattr(field, 'child'):
+                nested_fields.append((field.field_name, field.child))
+        buckets = pk_fields, many_fields, nested_fields
+        serializer._air_field_buckets = buckets
+        return buckets
+
     def _append_object_pks(self, queryset, value):
-        query_hash = self.hash_from_queryset(queryset)
         if value == fields.empty:
             return
+        query_hash = self.hash_from_queryset(queryset)
+        data = self._ensure_preload_entry_exists(query_hash, queryset)
+        _values = value if type(value) == list else [value]
+        self._add_validated_pks(data, _values)
+
+    def _ensure_preload_entry_exists(self, query_hash, queryset):
         if query_hash not in self._objects_for_preload:
+            pk_field = queryset.model._meta.pk
             self._objects_for_preload[query_hash] = {
                 'queryset': queryset,
-                'pks': []
+                'pks': set(),
+                'pk_field_name': pk_field.name,
+                'prep': self._get_pk_prep_function(pk_field)
             }
-        _values = value if type(value) == list else [value]
-        current_objects = self._objects_for_preload[query_hash]['pks']
-        data = self._objects_for_preload[query_hash]
-        data['pks'] += [v for v in self._get_validated_pks(queryset.model, _values) if v not in current_objects]
+        return self._objects_for_preload[query_hash]
+
+    @staticmethod
+    def _get_pk_prep_function(pk_field):
+        internal_type = pk_field.get_internal_type()
+        if internal_type in _INTEGER_PK_TYPES:
+            return int
+        if internal_type == 'UUIDField':
+            return _prep_uuid
+        return pk_field.get_prep_value
 
     @staticmethod
-    def _get_validated_pks(model, values):
-        result = []
+    def _add_validated_pks(data, values):
+        pks, pk_field_name, prep = data['pks'], data['pk_field_name'], data['prep']
         for v in values:
+            if type(v) == dict:
+                v = v.get(pk_field_name)
             try:
-                if type(v) == dict:
-                    v = v.get(model._meta.pk.name)
-                result.append(model._meta.pk.get_prep_value(v))
-            except (ValueError, TypeError):
+                pks.add(prep(v))
+            except (ValueError, TypeError, AttributeError, DjangoValidationError):
                 continue
-        return result
 
     @staticmethod
-    def find_preload_objects_manager(serializer):
-        preloaded_objects_attr = getattr(serializer, '_preload_objects_manager', None)
-        if preloaded_objects_attr is not None:
-            return preloaded_objects_attr
-        parent = getattr(serializer, 'parent', None)
-        if not parent:
+    def _find_preloaded_object(field, objects, data):
+        if not objects or isinstance(data, bool):
+            return None
+        try:
+            pk = field.queryset.model._meta.pk.to_python(data)
+            return objects.get(pk)
+        except (ValueError, TypeError, DjangoValidationError):
             return None
-        return PreloadObjectsManager.find_preload_objects_manager(parent)
+
+    @staticmethod
+    def _cache_loaded_object(objects, obj):
+        if obj is not None:
+            objects[obj.pk] = obj
+
+    @staticmethod
+    def get_active_manager(field):
+        manager = _current_manager.get()
+        if manager is None:
+            manager = PreloadObjectsManager.find_preload_objects_manager(field)
+        return manager
+
+    @staticmethod
+    def find_preload_objects_manager(serializer):
+        node = serializer
+        while node is not None:
+            manager = getattr(node, '_preload_objects_manager', None)
+            if manager is not None:
+                if node is not serializer:
+                    try:
+                        serializer._preload_objects_manager = manager
+                    except AttributeError:
+                        pass
+                return manager
+            node = getattr(node, 'parent', None)
+        return None
 
     @staticmethod
     def hash_from_queryset(queryset):
-        if hasattr(queryset, 'query'):
-            text = str(queryset.query)
-        elif hasattr(queryset, 'objects'):
-            text = str(queryset.objects)
-        else:
-            text = str(queryset)
-        return md5(text.encode()).hexdigest()
+        if isinstance(queryset, QuerySet):
+            # the sql is compiled once per queryset object, fields keep the same queryset during validation
+            query_hash = getattr(queryset, '_air_query_hash', None)
+            if query_hash is None:
+                query_hash = str(queryset.query)
+                queryset._air_query_hash = query_hash
+            return query_hash
+        if hasattr(queryset, 'objects'):
+            return str(queryset.objects)
+        return str(queryset)
 
     @staticmethod
     def enable_search_for_preloaded_objects():
@@ -102,24 +237,24 @@ class PreloadObjectsManager:
 
         def to_internal_value(self: PrimaryKeyRelatedField, data):
             query_hash = PreloadObjectsManager.hash_from_queryset(self.queryset)
-            manager = PreloadObjectsManager.find_preload_objects_manager(self)
+            manager = PreloadObjectsManager.get_active_manager(self)
             if manager:
-                if not manager.preloaded_objects.get(query_hash):
-                    manager.preloaded_objects[query_hash] = []
-                objects_by_queryset = manager.preloaded_objects[query_hash]
-                current_value = next((v for v in objects_by_queryset if getattr(v, 'pk') == data), None)
-                if current_value:
+                objects_by_queryset = manager.preloaded_objects.setdefault(query_hash, {})
+                current_value = PreloadObjectsManager._find_preloaded_object(self, objects_by_queryset, data)
+                if current_value is not None:
                     return current_value
             if hasattr(self, '_default_to_internal_value'):
                 result = self._default_to_internal_value(data)
                 if manager:
-                    if type(manager.preloaded_objects[query_hash]) == QuerySet:
-                        manager.preloaded_objects[query_hash] = list(manager.preloaded_objects[query_hash])
-                    manager.preloaded_objects[query_hash].append(result)
+                    PreloadObjectsManager._cache_loaded_object(manager.preloaded_objects[query_hash], result)
                 return result
 
         PrimaryKeyRelatedField.to_internal_value = to_internal_value
 
+    @staticmethod
+    def is_search_enabled():
+        return hasattr(PrimaryKeyRelatedField, '_default_to_internal_value')
+
     @staticmethod
     def disable_search_for_preloaded_objects():
         if hasattr(PrimaryKeyRelatedField, '_default_to_internal_value'):
@@ -1,13 +1,17 @@
+from django.core.exceptions import FieldDoesNotExist
 from django.db.models import QuerySet, Case, When
 from rest_framework import serializers
 from django.db import models
 
+_RELATIONS_CACHE = {}
+_ONLY_FIELDS_CACHE = {}
+
 
 def optimize_queryset(queryset, serializer):
     if queryset is None:
         return queryset
     queryset_type = type(queryset)
-    data = get_relations(serializer)
+    data = _get_relations(serializer)
     if issubclass(queryset_type, models.Model):
         queryset = serializer.Meta.model.objects.filter(pk=queryset.pk)
         queryset = queryset.select_related(*data['select']).prefetch_related(*data['prefetch']).first()
@@ -22,36 +26,100 @@ def optimize_queryset(queryset, serializer):
 
 
 def get_relations(serializer) -> dict:
-    return _get_relations(serializer)
+    relations = _get_relations(serializer)
+    return {'select': list(relations['select']), 'prefetch': list(relations['prefetch'])}
 
 
-def _get_relations(serializer, to_prefetch=False) -> dict:
-    results = {'select': [], 'prefetch': []}
-    _serializer = serializer() if type(serializer) == serializers.SerializerMetaclass else serializer
-    if not issubclass(type(_serializer), serializers.ModelSerializer):
-        return results
-    model_fields = [v.name for v in _serializer.Meta.model._meta.get_fields()]
-    for field, value in _serializer.fields.fields.items():
-        if field not in model_fields or value.write_only:
+def get_only_fields(serializer):
+    if isinstance(serializer, type) and serializer in _ONLY_FIELDS_CACHE:
+        return _ONLY_FIELDS_CACHE[serializer]
+    _serializer = serializer() if isinstance(serializer, type) else serializer
+    only_fields = _get_only_fields(_serializer, _get_relations(_serializer)['select'])
+    if only_fields is not None:
+        only_fields = list(dict.fromkeys(only_fields))
+    if isinstance(serializer, type):
+        _ONLY_FIELDS_CACHE[serializer] = only_fields
+    return only_fields
+
+
+def clear_relations_cache():
+    _RELATIONS_CACHE.clear()
+    _ONLY_FIELDS_CACHE.clear()
+
+
+def _get_only_fields(serializer, select, prefix=''):
+    # returns None when a readable field can not be mapped to a model field
+    opts = serializer.Meta.model._meta
+    results = [f'{prefix}{opts.pk.name}']
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*' or '.' in field.source:
+            return None
+        try:
+            model_field = opts.get_field(field.source)
+        except FieldDoesNotExist:
+            return None
+        if model_field.many_to_many or model_field.one_to_many:
             continue
-        field_serializer, field_to_prefetch = _get_field_serializer(value)
-        prefetch = to_prefetch or field_to_prefetch
-        if not field_serializer:
+        if not model_field.concrete:
+            return None
+        lookup = f'{prefix}{model_field.name}'
+        results.append(lookup)
+        if lookup not in select and not any(v.startswith(f'{lookup}__') for v in select):
             continue
-        relations = _get_relations(field_serializer, prefetch)
-        _append_relations_to_results(results, relations, field, prefetch)
+        field_serializer, _ = _get_field_serializer(field)
+        if isinstance(field_serializer, type):
+            field_serializer = field_serializer()
+        nested = _get_only_fields(field_serializer, select, f'{lookup}__')
+        if nested is None:
+            return None
+        results += nested
     return results
 
 
+def _get_relations(serializer, to_prefetch=False) -> dict:
+    key = _get_relations_cache_key(serializer, to_prefetch)
+    if key in _RELATIONS_CACHE:
+        return _RELATIONS_CACHE[key]
+    results = {'select': [], 'prefetch': []}
+    _serializer = serializer() if isinstance(serializer, type) else serializer
+    if isinstance(_serializer, serializers.ModelSerializer):
+        model_fields = [v.name for v in _serializer.Meta.model._meta.get_fields()]
+        for field, value in _serializer.fields.fields.items():
+            if field not in model_fields or value.write_only:
+                continue
+            field_serializer, field_to_prefetch = _get_field_serializer(value)
+            prefetch = to_prefetch or field_to_prefetch
+            if not field_serializer:
+                continue
+            relations = _get_relations(field_serializer, prefetch)
+            _append_relations_to_results(results, relations, field, prefetch)
+    results = {'select': tuple(results['select']), 'prefetch': tuple(results['prefetch'])}
+    _RELATIONS_CACHE[key] = results
+    return results
+
+
+def _get_relations_cache_key(serializer, to_prefetch):
+    # instances can hide fields or make them write only (extra_kwargs, actions),
+    # so their readable fields are a part of the key
+    if isinstance(serializer, type):
+        return serializer, to_prefetch, None
+    if not isinstance(serializer, serializers.ModelSerializer):
+        return serializer.__class__, to_prefetch, None
+    readable_fields = tuple(k for k, v in serializer.fields.fields.items() if not v.write_only)
+    return serializer.__class__, to_prefetch, readable_fields
+
+
 def _get_field_serializer(value):
-    current_type = type(value)
-    if issubclass(current_type, serializers.PrimaryKeyRelatedField) and hasattr(value, 'serializer'):
-        return value.serializer, False
-    elif issubclass(current_type, serializers.ModelSerializer):
+    if isinstance(value, serializers.PrimaryKeyRelatedField):
+        if hasattr(value, 'serializer'):
+            return value.serializer, False
+    elif isinstance(value, serializers.ModelSerializer):
         return value, False
-    elif issubclass(current_type, serializers.ListSerializer):
+    elif isinstance(value, serializers.ListSerializer):
         return value.child, True
-    elif issubclass(current_type, serializers.ManyRelatedField):
+    elif isinstance(value, serializers.ManyRelatedField):
         if hasattr(value.child_relation, 'serializer'):
             return value.child_relation.serializer, True
     return None, False
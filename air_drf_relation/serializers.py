@@ -1,6 +1,16 @@
+import copy
+import dataclasses
+from types import MappingProxyType
+from operator import attrgetter
 from typing import TypeVar, Dict, Any
-from rest_framework.fields import empty
-from rest_framework.relations import PrimaryKeyRelatedField
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from django.db.models.signals import m2m_changed
+from django.utils.functional import cached_property
+from django.utils.translation import get_language
+from rest_framework.exceptions import ErrorDetail
+from rest_framework.fields import empty, SkipField
+from rest_framework.relations import PrimaryKeyRelatedField, PKOnlyObject, ManyRelatedField
 from rest_framework.utils import model_meta
 from rest_framework import serializers
 from django.db.models import ForeignKey
@@ -8,14 +18,29 @@ from rest_framework_dataclasses.serializers import DataclassSerializer
 from rest_framework_dataclasses.types import Dataclass
 
 from air_drf_relation.context_builder import set_empty_request_in_kwargs
+from air_drf_relation.dataclass_validator import FallbackValidation, MissingRequiredFields, build_dataclass_validator, \
+    is_validator_compatible
 from air_drf_relation.extra_kwargs import ExtraKwargsFactory
-from air_drf_relation.fields import AirRelatedField
+from air_drf_relation.fields import AirRelatedField, AirManyRelatedField
 from air_drf_relation.preload_objects_manager import PreloadObjectsManager
-from air_drf_relation.queryset_optimization import optimize_queryset
-from air_drf_relation.utils import stringify_uuids
+from air_drf_relation.queryset_optimization import optimize_queryset, get_relations, get_only_fields
+from air_drf_relation.utils import stringify_uuids, uuid_to_str
 
 T = TypeVar('T', bound=Dataclass)
 
+_FAST_READ_COERCERS = {
+    serializers.CharField: str,
+    serializers.IntegerField: int,
+    serializers.BooleanField: bool,
+    serializers.UUIDField: uuid_to_str,
+}
+
+_FIELD_BUILD_HOOKS = (
+    'get_field_names', 'get_default_field_names', 'get_extra_kwargs', 'get_uniqueness_extra_kwargs',
+    'include_extra_kwargs', 'build_field', 'build_standard_field', 'build_relational_field', 'build_nested_field',
+    'build_property_field', 'build_url_field', 'build_unknown_field',
+)
+
 
 class AirSerializer(serializers.Serializer):
     def __init__(self, *args, **kwargs):
@@ -32,7 +57,8 @@ class AirSerializer(serializers.Serializer):
     def is_valid(self, raise_exception=False):
         if self.preload_objects is not False:
             self._preload_objects_manager = PreloadObjectsManager.get_preload_objects_manager(self).init()
-        return super(AirSerializer, self).is_valid(raise_exception=raise_exception)
+        with PreloadObjectsManager.activate(self._preload_objects_manager):
+            return super(AirSerializer, self).is_valid(raise_exception=raise_exception)
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
@@ -88,9 +114,63 @@ class AirModelSerializer(serializers.ModelSerializer, AirSerializer):
         super(AirModelSerializer, self).__init__(*args, **kwargs)
         self._update_fields()
 
+    @classmethod
+    def setup_eager_loading(cls, queryset, only=True):
+        relations = get_relations(cls)
+        queryset = queryset.select_related(*relations['select']).prefetch_related(*relations['prefetch'])
+        only_fields = get_only_fields(cls) if only else None
+        return queryset.only(*only_fields) if only_fields else queryset
+
     def update_or_create(self, instance, validated_data):
+        many_to_many = self._pop_many_to_many(validated_data)
         super_class = super(AirModelSerializer, self)
-        return super_class.create(validated_data) if not instance else super_class.update(instance, validated_data)
+        created = not instance
+        instance = super_class.create(validated_data) if created else super_class.update(instance, validated_data)
+        for model_field, values in many_to_many:
+            self._save_many_to_many(instance, model_field, values, created)
+        return instance
+
+    def _pop_many_to_many(self, validated_data):
+        result = []
+        if not getattr(self.Meta, 'bulk_many_to_many', False):
+            return result
+        for field in self._writable_fields:
+            if not isinstance(field, ManyRelatedField) or field.source not in validated_data:
+                continue
+            try:
+                model_field = self.Meta.model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                continue
+            if not isinstance(model_field, models.ManyToManyField) or model_field.remote_field.symmetrical or \
+                    not model_field.remote_field.through._meta.auto_created:
+                continue
+            result.append((model_field, validated_data.pop(field.source)))
+        return result
+
+    @staticmethod
+    def _save_many_to_many(instance, model_field, values, created):
+        through = model_field.remote_field.through
+        source_name = through._meta.get_field(model_field.m2m_field_name()).attname
+        target_name = through._meta.get_field(model_field.m2m_reverse_field_name()).attname
+        db = instance._state.db
+        manager = through._default_manager.using(db)
+        signal_kwargs = {'sender': through, 'instance': instance, 'reverse': False,
+                         'model': model_field.related_model, 'using': db}
+        pks = {v.pk for v in values}
+        if not created:
+            existing = set(manager.filter(**{source_name: instance.pk}).values_list(target_name, flat=True))
+            removed = existing - pks
+            if removed:
+                m2m_changed.send(action='pre_remove', pk_set=removed, **signal_kwargs)
+                manager.filter(**{source_name: instance.pk, f'{target_name}__in': removed}).delete()
+                m2m_changed.send(action='post_remove', pk_set=removed, **signal_kwargs)
+            pks -= existing
+        if pks:
+            m2m_changed.send(action='pre_add', pk_set=pks, **signal_kwargs)
+            manager.bulk_create([through(**{source_name: instance.pk, target_name: v}) for v in pks],
+                                ignore_conflicts=True)
+            m2m_changed.send(action='post_add', pk_set=pks, **signal_kwargs)
+        getattr(instance, '_prefetched_objects_cache', {}).pop(model_field.name, None)
 
     def create(self, validated_data):
         return self.update_or_create(None, validated_data)
@@ -133,24 +213,63 @@ class AirModelSerializer(serializers.ModelSerializer, AirSerializer):
             function_name = None
             if isinstance(field, AirRelatedField):
                 if field.queryset_function_disabled:
-                    return
+                    continue
                 function_name = field.queryset_function_name
             if not function_name:
-                function_name = f'queryset_{field.field_name}'
-            if hasattr(self.__class__, function_name) and callable(getattr(self.__class__, function_name)):
-                field.queryset = getattr(self.__class__, function_name)(self=self, queryset=field.queryset)
+                function_name = f'queryset_{field_name}'
+            function = getattr(self.__class__, function_name, None)
+            if callable(function):
+                field.queryset = function(self=self, queryset=field.queryset)
 
     def _get_related_fields(self):
         related_fields = dict()
         for field_name, field in self.fields.items():
-            if type(field) in (AirRelatedField, PrimaryKeyRelatedField):
+            if type(field) in (AirManyRelatedField, ManyRelatedField):
+                field = field.child_relation
+            if type(field) in (AirRelatedField, PrimaryKeyRelatedField) and not field.read_only:
                 related_fields[field_name] = field
         return related_fields
 
     def _get_extra_kwargs(self):
-        data = {'extra_kwargs': self._initial_extra_kwargs}
-        extra_kwargs = ExtraKwargsFactory(meta=self.Meta, data=data, action=self.action).init().extra_kwargs
-        self._delete_custom_extra_kwargs_in_meta()
+        extra_kwargs = self._get_action_extra_kwargs(self.action)
+        if not self._initial_extra_kwargs:
+            return dict(extra_kwargs)
+        return ExtraKwargsFactory.merge_extra_kwargs([extra_kwargs, self._initial_extra_kwargs])
+
+    @classmethod
+    def _get_action_extra_kwargs(cls, action):
+        cache = cls.__dict__.get('_action_extra_kwargs_cache')
+        if cache is None:
+            cache = {}
+            cls._action_extra_kwargs_cache = cache
+        if action not in cache:
+            extra_kwargs = ExtraKwargsFactory(meta=cls.Meta, data={}, action=action).init().extra_kwargs
+            cache[action] = {k: MappingProxyType(v) for k, v in extra_kwargs.items()}
+        return cache[action]
+
+    def get_fields(self):
+        if not self._can_cache_fields():
+            return super(AirModelSerializer, self).get_fields()
+        fields = self.__class__.__dict__.get('_fields_cache')
+        if fields is None:
+            fields = super(AirModelSerializer, self).get_fields()
+            self.__class__._fields_cache = fields
+        return copy.deepcopy(fields)
+
+    @classmethod
+    def _can_cache_fields(cls):
+        # overridden hooks may depend on the instance or its context, their fields are built per instance
+        can_cache = cls.__dict__.get('_can_cache_fields_value')
+        if can_cache is None:
+            can_cache = all(getattr(cls, v) is getattr(AirModelSerializer, v) for v in _FIELD_BUILD_HOOKS)
+            cls._can_cache_fields_value = can_cache
+        return can_cache
+
+    def get_extra_kwargs(self):
+        extra_kwargs = super(AirModelSerializer, self).get_extra_kwargs()
+        for value in extra_kwargs.values():
+            value.pop('pk_only', None)
+            value.pop('hidden', None)
         return extra_kwargs
 
     def _update_extra_kwargs_in_fields(self):
@@ -161,13 +280,6 @@ class AirModelSerializer(serializers.ModelSerializer, AirSerializer):
             except KeyError:
                 continue
 
-    def _delete_custom_extra_kwargs_in_meta(self):
-        if not hasattr(self.Meta, 'extra_kwargs'):
-            return
-        for field_name, field in self.Meta.extra_kwargs.items():
-            field.pop('pk_only', None)
-            field.pop('hidden', None)
-
     def _set_action_from_view(self, kwargs):
         context = kwargs.get('context', None)
         if not context:
@@ -196,7 +308,60 @@ class AirModelSerializer(serializers.ModelSerializer, AirSerializer):
     def to_representation(self, instance):
         if getattr(self, 'parent') is None and self.optimize_queryset:
             instance = optimize_queryset(instance, self)
-        return super(AirModelSerializer, self).to_representation(instance)
+        if getattr(self.Meta, 'fast_read', False) and isinstance(instance, models.Model):
+            return stringify_uuids(self._build_representation(instance, self._fast_read_fields))
+        return stringify_uuids(self._build_representation(instance, self._representation_fields))
+
+    @staticmethod
+    def _build_representation(instance, fields):
+        ret = {}
+        for field_name, field, getter, coerce in fields:
+            if getter is not None:
+                value = getter(instance)
+                ret[field_name] = value if value is None or coerce is None else coerce(value)
+                continue
+            try:
+                attribute = field.get_attribute(instance)
+            except SkipField:
+                continue
+            check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+            ret[field_name] = None if check_for_none is None else field.to_representation(attribute)
+        return ret
+
+    @cached_property
+    def _representation_fields(self):
+        return [(field.field_name, field, None, None) for field in self._readable_fields]
+
+    @cached_property
+    def _fast_read_fields(self):
+        result = []
+        for field in self._readable_fields:
+            getter, coerce = self._get_fast_read_getter(field)
+            result.append((field.field_name, field, getter, coerce))
+        return result
+
+    def _get_fast_read_getter(self, field):
+        if len(field.source_attrs) != 1:
+            return None, None
+        # only concrete model fields, other sources may be callables or properties
+        try:
+            model_field = self.Meta.model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            return None, None
+        if not model_field.concrete:
+            return None, None
+        field_type = type(field)
+        if field_type in _FAST_READ_COERCERS:
+            if model_field.is_relation:
+                return None, None
+            if field_type is serializers.UUIDField and field.uuid_format != 'hex_verbose':
+                return None, None
+            return attrgetter(model_field.attname), _FAST_READ_COERCERS[field_type]
+        if isinstance(field, AirRelatedField) and field.pk_only:
+            if model_field.many_to_one or model_field.one_to_one:
+                is_uuid_pk = isinstance(model_field.target_field, models.UUIDField)
+                return attrgetter(model_field.attname), uuid_to_str if is_uuid_pk else None
+        return None, None
 
 
 class AirListSerializer(serializers.ListSerializer):
@@ -208,7 +373,8 @@ class AirListSerializer(serializers.ListSerializer):
     def is_valid(self, raise_exception=False):
         if self.preload_objects is not False and getattr(self.child, 'preload_objects', None) is not False:
             self._preload_objects_manager = PreloadObjectsManager.get_preload_objects_manager(self).init()
-        return super(AirListSerializer, self).is_valid(raise_exception=raise_exception)
+        with PreloadObjectsManager.activate(self._preload_objects_manager):
+            return super(AirListSerializer, self).is_valid(raise_exception=raise_exception)
 
     def update(self, instance, validated_data):
         super(AirListSerializer, self).update(instance, validated_data)
@@ -240,17 +406,71 @@ class AirDynamicSerializer(AirEmptySerializer):
 
 class AirDataclassSerializer(DataclassSerializer):
     def to_internal_value(self, data: Dict[str, Any]) -> T:
-        instance = super(AirDataclassSerializer, self).to_internal_value(data)
-        dataclass = self.Meta.dataclass
-        for key in instance.__dict__.keys():
-            if getattr(instance, key) == empty:
+        instance = self._fast_to_internal_value(data)
+        if instance is None:
+            instance = super(AirDataclassSerializer, self).to_internal_value(data)
+        for field in dataclasses.fields(instance):
+            if getattr(instance, field.name) is empty:
                 if self.instance:
-                    value = getattr(self.instance, key, None)
+                    value = getattr(self.instance, field.name, None)
                 else:
-                    value = getattr(dataclass, key, None)
-                setattr(instance, key, value)
+                    value = self._get_dataclass_field_default(field)
+                setattr(instance, field.name, value)
         return instance
 
+    @staticmethod
+    def _get_dataclass_field_default(field):
+        # slotted dataclasses do not keep defaults as class attributes
+        if field.default is not dataclasses.MISSING:
+            return field.default
+        if field.default_factory is not dataclasses.MISSING:
+            return field.default_factory()
+        return None
+
+    def _fast_to_internal_value(self, data):
+        validator = self._dataclass_validator
+        if validator is None or type(data) is not dict:
+            return None
+        try:
+            return validator(data)
+        except MissingRequiredFields as exc:
+            if getattr(self.root, 'partial', False):
+                return None
+            error = self._get_required_error()
+            raise serializers.ValidationError({field_name: error for field_name in exc.fields})
+        except (FallbackValidation, TypeError, ValueError):
+            return None
+
+    @classmethod
+    def _get_required_error(cls):
+        cache = cls.__dict__.get('_required_error_cache')
+        if cache is None:
+            cache = {}
+            cls._required_error_cache = cache
+        language = get_language()
+        if language not in cache:
+            message = str(serializers.Field.default_error_messages['required'])
+            cache[language] = (ErrorDetail(message, code='required'),)
+        return cache[language]
+
+    @cached_property
+    def _dataclass_validator(self):
+        dataclass = self.dataclass_definition.dataclass_type
+        validator = self._get_dataclass_validator(dataclass)
+        if validator is None or not is_validator_compatible(self, dataclass):
+            return None
+        return validator
+
+    @classmethod
+    def _get_dataclass_validator(cls, dataclass):
+        cache = cls.__dict__.get('_dataclass_validator_cache')
+        if cache is None:
+            cache = {}
+            cls._dataclass_validator_cache = cache
+        if dataclass not in cache:
+            cache[dataclass] = build_dataclass_validator(dataclass)
+        return cache[dataclass]
+
     def run_validation(self, data=empty):
         if self.parent and getattr(self.parent, 'instance', None):
             self.instance = getattr(self.parent.instance, self.source, None)
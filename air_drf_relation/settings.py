@@ -3,3 +3,7 @@ from django.conf import settings
 air_drf_relation_settings = settings.AIR_DRF_RELATION if hasattr(settings, 'AIR_DRF_RELATION') else {}
 if 'USE_PRELOAD' not in air_drf_relation_settings:
     air_drf_relation_settings['USE_PRELOAD'] = True
+if 'PRELOAD_PARALLEL' not in air_drf_relation_settings:
+    air_drf_relation_settings['PRELOAD_PARALLEL'] = False
+if 'PRELOAD_CHUNK_SIZE' not in air_drf_relation_settings:
+    air_drf_relation_settings['PRELOAD_CHUNK_SIZE'] = 1000
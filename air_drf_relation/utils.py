@@ -1,10 +1,11 @@
 import uuid
+from functools import lru_cache
 
 
 def get_pk_from_data(data, pk_name):
-    if type(data) in [list, tuple]:
-        return [v.get(pk_name) if type(v) == dict else v for v in data]
-    return data.get(pk_name) if type(data) == dict else data
+    if isinstance(data, (list, tuple)):
+        return [v.get(pk_name) if isinstance(v, dict) else v for v in data]
+    return data.get(pk_name) if isinstance(data, dict) else data
 
 
 def create_dict_from_list(values: list, value_data) -> dict:
@@ -22,11 +23,22 @@ def stringify_uuids(value):
         for i, v in enumerate(value):
             value[i] = stringify_uuids(v)
     elif isinstance(value, uuid.UUID):
-        return str(value)
+        return _uuid_int_to_str(value.int)
     return value
 
 
+def uuid_to_str(value) -> str:
+    return _uuid_int_to_str(value.int) if isinstance(value, uuid.UUID) else str(value)
+
+
+@lru_cache(maxsize=4096)
+def _uuid_int_to_str(value: int) -> str:
+    return str(uuid.UUID(int=value))
+
+
 def is_uuid(value: str) -> bool:
+    if isinstance(value, uuid.UUID):
+        return True
     try:
         uuid.UUID(value)
         return True
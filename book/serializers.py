@@ -38,6 +38,16 @@ class BookSerializer(AirModelSerializer):
         fields = ('uuid', 'name', 'author', 'city')
 
 
+class BookFastReadSerializer(AirModelSerializer):
+    author = AirRelatedField(AuthorSerializer, pk_only=True)
+    city = AirRelatedField(CitySerializer)
+
+    class Meta:
+        model = Book
+        fields = ('uuid', 'name', 'author', 'city')
+        fast_read = True
+
+
 class BookReadOnlySerializer(AirModelSerializer):
     author = AirRelatedField(AuthorSerializer, read_only=True)
     city = AirRelatedField(CitySerializer, read_only=True)
@@ -132,6 +142,16 @@ class BookWithGenreSerializer(AirModelSerializer):
         fields = ('id', 'genres', 'name', 'author', 'city')
 
 
+class BookWithFilteredGenreSerializer(BookWithGenreSerializer):
+    def queryset_genres(self, queryset):
+        return queryset.exclude(name='hidden')
+
+
+class BookWithGenreBulkSerializer(BookWithGenreSerializer):
+    class Meta(BookWithGenreSerializer.Meta):
+        bulk_many_to_many = True
+
+
 class DisableOptimizationBookSerializer(BookWithGenreSerializer):
     class Meta(BookWithGenreSerializer.Meta):
         optimize_queryset = False
@@ -1,13 +1,17 @@
-from uuid import uuid4
+from uuid import uuid4, UUID
 from django.conf import settings
 
 from air_drf_relation.decorators import queries_count
+from air_drf_relation.extra_kwargs import ExtraKwargsFactory
+from air_drf_relation.fields import AirRelatedField
 from air_drf_relation.queryset_optimization import get_relations
-from air_drf_relation.serializers import AirDynamicSerializer
+from air_drf_relation.serializers import AirDynamicSerializer, AirModelSerializer
+from air_drf_relation.utils import uuid_to_str
 from rest_framework import serializers
 
 from .filters import AuthorFilter
 from django.db import connection, reset_queries
+from django.db.models.signals import m2m_changed
 
 from django.contrib.auth.models import User
 from django.test import TestCase
@@ -16,7 +20,8 @@ from .models import Author, Book, City, Genre, Magazine, Bookmark
 from .serializers import BookSerializer, DefaultBookSerializer, MagazineSerializer, MagazineSpecialSerializer, \
     BookReadOnlySerializer, BookHiddenSerializer, BookActionKwargsSerializer, CityWritablePkSerializer, \
     BookWithGenreSerializer, DefaultMagazineSerializer, BookWithGenreListSerializer, BookmarkSerializer, \
-    DisableOptimizationBookSerializer
+    DisableOptimizationBookSerializer, BookFastReadSerializer, BookWithFilteredGenreSerializer, \
+    BookWithGenreBulkSerializer
 
 settings.DEBUG = True
 
@@ -58,6 +63,31 @@ class TestBookObjects(TestCase):
         self.assertEqual(type(data['author']), int)
         self.assertEqual(type(data['city']), str)
 
+    def test_fast_read_serialization(self):
+        data = BookFastReadSerializer(self.book).data
+        expected = BookSerializer(self.book, extra_kwargs={'author': {'pk_only': True}}).data
+        self.assertEqual(data, expected)
+        self.assertEqual(type(data['uuid']), str)
+        self.assertEqual(type(data['author']), int)
+        data = BookFastReadSerializer(Book.objects.all(), many=True).data
+        self.assertEqual(data[0], expected)
+
+    def test_fast_read_method_source(self):
+        class BookTitleSerializer(AirModelSerializer):
+            title = serializers.CharField(source='__str__', read_only=True)
+
+            class Meta:
+                model = Book
+                fields = ('uuid', 'name', 'title')
+                fast_read = True
+
+        self.assertEqual(BookTitleSerializer(self.book).data['title'], str(self.book))
+
+    def test_representation_is_plain_dict(self):
+        data = BookSerializer(self.book).to_representation(self.book)
+        self.assertIs(type(data), dict)
+        self.assertEqual(list(data), ['uuid', 'name', 'author', 'city'])
+
     def test_required_creation(self):
         data = {'name': 'required and allow null creation'}
         extra_kwargs = {'author': {'required': True}, 'city': {'required': True}}
@@ -95,6 +125,71 @@ class TestBookObjects(TestCase):
         self.assertEqual(serializer.data['author'], None)
         self.assertEqual(serializer.data['city'], None)
 
+    def test_read_only_nested_representation(self):
+        Book.objects.create(name='second', author=self.author2, city=self.city2)
+        serializer = BookReadOnlySerializer(Book.objects.order_by('name'), many=True)
+        data = serializer.data
+        for book, value in zip(Book.objects.order_by('name'), data):
+            self.assertEqual(value, BookReadOnlySerializer(book).data)
+        self.assertIsInstance(data[0]['author'], ReturnDict)
+
+    def test_nested_serializer_instance(self):
+        class AuthorInstanceSerializer(AirModelSerializer):
+            is_instance = serializers.SerializerMethodField()
+
+            class Meta:
+                model = Author
+                fields = ('id', 'is_instance')
+
+            def get_is_instance(self, obj):
+                return self.instance is obj
+
+        class BookAuthorInstanceSerializer(AirModelSerializer):
+            author = AirRelatedField(AuthorInstanceSerializer, read_only=True)
+
+            class Meta:
+                model = Book
+                fields = ('uuid', 'author')
+
+        Book.objects.create(name='second', author=self.author2, city=self.city2)
+        data = BookAuthorInstanceSerializer(Book.objects.all(), many=True).data
+        self.assertEqual(len(data), 2)
+        self.assertTrue(all(v['author']['is_instance'] for v in data))
+
+    def test_nested_serializer_init_with_instance(self):
+        class AuthorSecretSerializer(AirModelSerializer):
+            class Meta:
+                model = Author
+                fields = ('id', 'name')
+
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                if self.instance is not None and self.instance.name == 'secret':
+                    self.fields.pop('name')
+
+        class BookAuthorSecretSerializer(AirModelSerializer):
+            author = AirRelatedField(AuthorSecretSerializer, read_only=True)
+
+            class Meta:
+                model = Book
+                fields = ('uuid', 'author')
+
+        secret = Author.objects.create(name='secret')
+        Book.objects.create(name='secret book', author=secret, city=self.city)
+        data = BookAuthorSecretSerializer(Book.objects.order_by('name'), many=True).data
+        self.assertEqual([v['author'] for v in data], [{'id': self.author.pk, 'name': self.author.name},
+                                                       {'id': secret.pk}])
+
+    def test_nested_representation_is_not_shared(self):
+        Book.objects.create(name='same author', author=self.author, city=self.city)
+        queryset = Book.objects.filter(author=self.author)
+        serializer = BookReadOnlySerializer(queryset, many=True)
+        data = serializer.data
+        self.assertEqual(len(data), 2)
+        self.assertEqual(data[0]['author'], data[1]['author'])
+        data[0]['city']['name'] = 'mutated'
+        self.assertEqual(data[1]['city']['name'], self.city.name)
+
     def test_read_only_as_default_kwargs_creation(self):
         data = {'name': 'read only as default kwargs', 'author': self.author.pk, 'city': str(self.city.pk)}
         serializer = BookReadOnlySerializer(data=data)
@@ -123,6 +218,55 @@ class TestBookObjects(TestCase):
         self.assertEqual(result['name'], '')
         self.assertEqual(result['city'], None)
 
+    def test_hidden_kwargs_for_each_instance(self):
+        for action in [None, 'create', None]:
+            data = BookHiddenSerializer(self.book, action=action).data
+            self.assertEqual(data.get('name', False), False)
+            self.assertEqual(data.get('author', False), False)
+
+    def test_fields_are_copied_for_each_instance(self):
+        first = BookSerializer(self.book, extra_kwargs={'author': {'pk_only': True}})
+        second = BookSerializer(self.book)
+        self.assertIsNot(first.fields['author'], second.fields['author'])
+        self.assertEqual(first.data['author'], self.author.pk)
+        self.assertEqual(second.data['author']['id'], self.author.pk)
+
+    def test_field_state_is_not_shared(self):
+        validators_count = len(BookSerializer().fields['name'].validators)
+        serializer = BookSerializer()
+        serializer.fields['name'].validators.append(lambda value: value)
+        serializer.fields['name'].error_messages['blank'] = 'changed'
+        serializer = BookSerializer()
+        self.assertEqual(len(serializer.fields['name'].validators), validators_count)
+        self.assertNotEqual(serializer.fields['name'].error_messages['blank'], 'changed')
+
+    def test_context_dependent_field_names(self):
+        class AuthorStaffSerializer(AirModelSerializer):
+            class Meta:
+                model = Author
+                fields = ('id', 'name', 'active')
+
+            def get_field_names(self, declared_fields, info):
+                field_names = super().get_field_names(declared_fields, info)
+                if self.context.get('staff'):
+                    return field_names
+                return [v for v in field_names if v != 'active']
+
+        self.assertEqual(set(AuthorStaffSerializer(context={'staff': True}).fields), {'id', 'name', 'active'})
+        self.assertEqual(set(AuthorStaffSerializer(context={'staff': False}).fields), {'id', 'name'})
+
+    def test_list_field_child_context(self):
+        class AuthorTagsSerializer(AirModelSerializer):
+            tags = serializers.ListField(child=serializers.CharField(), required=False)
+
+            class Meta:
+                model = Author
+                fields = ('id', 'name', 'tags')
+
+        for value in ('first', 'second'):
+            serializer = AuthorTagsSerializer(context={'value': value})
+            self.assertEqual(serializer.fields['tags'].child.context, {'value': value})
+
     def test_action_kwargs(self):
         data = {'name': 'hidden', 'city': str(self.city.pk), 'author': self.author.pk}
         serializer = BookActionKwargsSerializer(data=data, action='create')
@@ -138,6 +282,14 @@ class TestBookObjects(TestCase):
         self.assertEqual(serializer.data.get('name', False), False)
         self.assertEqual(instance.author, None)
 
+    def test_action_keys(self):
+        class Meta:
+            action_read_only_fields = {'create, update': ('name',), '_': ('author',)}
+
+        for action, expected in (('create', {'name'}), ('update', {'name'}), ('list', {'author'})):
+            extra_kwargs = ExtraKwargsFactory(meta=Meta, data={}, action=action).init().extra_kwargs
+            self.assertEqual(set(extra_kwargs), expected)
+
     def test_queryset_creation(self):
         data = {'name': 'queryset', 'author': self.author3.pk, 'city': str(self.city3.pk)}
         serializer = BookSerializer(data=data)
@@ -150,6 +302,10 @@ class TestBookObjects(TestCase):
         serializer.is_valid()
         self.assertEqual(len(serializer.errors), 0)
 
+        serializer = BookSerializer(data=data, extra_kwargs={'author': {'queryset_function_disabled': True}})
+        serializer.is_valid()
+        self.assertEqual(list(serializer.errors), ['city'])
+
     def test_create_from_dict(self):
         data = {'name': 'create from dict', 'author': {
             'id': self.author.pk
@@ -176,6 +332,64 @@ class TestBookObjects(TestCase):
         instance = serializer.save()
         self.assertEqual(instance.genres.count(), 2)
 
+    def test_bulk_many_to_many_save(self):
+        Genre.objects.create(name='1', id=1)
+        Genre.objects.create(name='2', id=2)
+        Genre.objects.create(name='3', id=3)
+        actions = []
+
+        def receiver(action, pk_set, **kwargs):
+            actions.append((action, pk_set))
+
+        m2m_changed.connect(receiver, sender=Book.genres.through)
+        self.addCleanup(m2m_changed.disconnect, receiver, sender=Book.genres.through)
+
+        serializer = BookWithGenreBulkSerializer(data={'name': 'many to many', 'genres': [1, {'id': 2}]})
+        serializer.is_valid(raise_exception=True)
+        reset_queries()
+        instance = serializer.save()
+        self.assertEqual(len(connection.queries), 2)
+        self.assertEqual(actions, [('pre_add', {1, 2}), ('post_add', {1, 2})])
+
+        actions.clear()
+        instance = Book.objects.prefetch_related('genres').get(pk=instance.pk)
+        self.assertEqual([v.pk for v in instance.genres.all()], [1, 2])
+        serializer = BookWithGenreBulkSerializer(instance, data={'name': 'many to many', 'genres': [2, 3]})
+        serializer.is_valid(raise_exception=True)
+        reset_queries()
+        instance = serializer.save()
+        self.assertEqual(len(connection.queries), 4)
+        self.assertEqual(sorted(v.pk for v in instance.genres.all()), [2, 3])
+        self.assertEqual(actions, [('pre_remove', {1}), ('post_remove', {1}), ('pre_add', {3}), ('post_add', {3})])
+
+    def test_many_to_many_without_preload(self):
+        Genre.objects.create(name='1', id=1)
+        Genre.objects.create(name='2', id=2)
+
+        data = {'name': 'many to many', 'genres': [1, {'id': 2}, '2']}
+        serializer = BookWithGenreSerializer(data=data, preload_objects=False)
+        reset_queries()
+        serializer.is_valid(raise_exception=True)
+        self.assertEqual(len(connection.queries), 1)
+        self.assertEqual([v.pk for v in serializer.validated_data['genres']], [1, 2, 2])
+
+        serializer = BookWithGenreSerializer(data={'name': 'many to many', 'genres': [1, 3]}, preload_objects=False)
+        serializer.is_valid()
+        self.assertEqual(len(serializer.errors), 1)
+
+    def test_many_to_many_queryset_function(self):
+        Genre.objects.create(name='1', id=1)
+        Genre.objects.create(name='hidden', id=2)
+
+        serializer = BookWithFilteredGenreSerializer(data={'name': 'filtered', 'genres': [1, 2]}, preload_objects=False)
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(list(serializer.errors), ['genres'])
+
+        serializer = BookWithFilteredGenreSerializer(data={'name': 'filtered', 'genres': [1, 1]}, preload_objects=False)
+        reset_queries()
+        serializer.is_valid(raise_exception=True)
+        self.assertEqual(len(connection.queries), 1)
+
     def test_set_user(self):
         user = User.objects.create(email='demo@demo.com')
         serializer = BookSerializer(data={'name': 'custom set user'}, user=user)
@@ -256,6 +470,12 @@ class TestMagazineObjects(TestCase):
         self.assertEqual(type(serializer.data['city']), str)
         self.assertTrue(all([type(v) == str for v in serializer.data['available_cities']]))
 
+    def test_uuid_to_str(self):
+        value = uuid4()
+        self.assertEqual(uuid_to_str(value), str(value))
+        self.assertIs(uuid_to_str(value), uuid_to_str(UUID(str(value))))
+        self.assertEqual(uuid_to_str(str(value)), str(value))
+
 
 class TestOptimizeQuerySet(TestCase):
     def setUp(self) -> None:
@@ -279,6 +499,29 @@ class TestOptimizeQuerySet(TestCase):
         self.assertEqual(['author', 'city__parent_city'], data['select'])
         self.assertEqual(['genres__city__parent_city'], data['prefetch'])
 
+    def test_get_fields_data_with_hidden_fields(self):
+        get_relations(BookWithGenreSerializer)
+        data = get_relations(BookWithGenreSerializer(extra_kwargs={'author': {'hidden': True}}))
+        self.assertEqual(['city__parent_city'], data['select'])
+        self.assertEqual(['genres__city__parent_city'], data['prefetch'])
+        data = get_relations(BookWithGenreSerializer)
+        self.assertEqual(['author', 'city__parent_city'], data['select'])
+
+    def test_setup_eager_loading(self):
+        queryset = BookWithGenreSerializer.setup_eager_loading(Book.objects.all())
+        self.assertEqual(('genres__city__parent_city',), queryset._prefetch_related_lookups)
+        reset_queries()
+        _ = BookWithGenreSerializer(queryset, many=True, optimize_queryset=False).data
+        self.assertEqual(len(connection.queries), 4)
+
+        queryset = BookSerializer.setup_eager_loading(Book.objects.all())
+        self.assertEqual(queryset.query.deferred_loading[1], False)
+        self.assertIn('city__parent_city__name', queryset.query.deferred_loading[0])
+        reset_queries()
+        data = BookSerializer(queryset, many=True, optimize_queryset=False).data
+        self.assertEqual(len(connection.queries), 1)
+        self.assertEqual(data, BookSerializer(Book.objects.all(), many=True).data)
+
     def test_optimize_queryset(self):
         reset_queries()
         _ = BookWithGenreSerializer(self.book).data
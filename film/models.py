@@ -3,7 +3,7 @@ from dataclasses import dataclass
 from air_drf_relation.model_fields import AirDataclassField
 
 
-@dataclass
+@dataclass(slots=True)
 class FilmInformation:
     budget: float
     rating: str
@@ -1,5 +1,9 @@
+import math
+from concurrent.futures import ThreadPoolExecutor
 from random import randint
-from django.test import TestCase
+from unittest import mock
+from django.test import TestCase, TransactionTestCase
+from air_drf_relation import air_drf_relation_settings
 from air_drf_relation.preload_objects_manager import PreloadObjectsManager
 from table.models import Material, Table, Company, Color, Leg
 from table.serializers import TableSerializer, TableWithLegsSerializer, CustomSerializer
@@ -98,6 +102,39 @@ class ValidatePreload(TestCase):
         serializer.is_valid(raise_exception=True)
         self.assertEqual(len(connection.queries), 3)
 
+    def test_chunked_preload_in_transaction(self):
+        settings_patch = {'PRELOAD_PARALLEL': True, 'PRELOAD_CHUNK_SIZE': 7}
+        with mock.patch.dict(air_drf_relation_settings, settings_patch), \
+                mock.patch('air_drf_relation.preload_objects_manager.ThreadPoolExecutor') as executor:
+            serializer = TableSerializer(data=self.data, many=True)
+            reset_queries()
+            serializer.is_valid(raise_exception=True)
+        executor.assert_not_called()
+        counts = [len({v for el in self.data for v in el['legs']}), len({v['color'] for v in self.data}),
+                  len({v['material']['company'] for v in self.data})]
+        self.assertEqual(len(connection.queries), sum(math.ceil(v / 7) for v in counts))
+
+
+class ValidateParallelPreload(TransactionTestCase):
+    def setUp(self) -> None:
+        Company.objects.bulk_create([Company(name=v) for v in range(5)])
+        Color.objects.bulk_create([Color(name=v) for v in range(5)])
+        Material.objects.bulk_create([Material(name=v, company_id=get_id(5)) for v in range(5)])
+        Leg.objects.bulk_create([Leg(name=v, color_id=get_id(5), material_id=get_id(5)) for v in range(10)])
+        self.data = [{'name': v, 'material': {'company': get_id(5)}, 'color': get_id(5),
+                      'legs': [get_id(10) for _ in range(3)]} for v in range(20)]
+
+    def test_parallel_preload(self):
+        with mock.patch.dict(air_drf_relation_settings, {'PRELOAD_PARALLEL': True}), \
+                mock.patch('air_drf_relation.preload_objects_manager.ThreadPoolExecutor',
+                           wraps=ThreadPoolExecutor) as executor:
+            serializer = TableSerializer(data=self.data, many=True)
+            serializer.is_valid(raise_exception=True)
+        executor.assert_called_once()
+        manager = serializer._preload_objects_manager
+        legs_hash = PreloadObjectsManager.hash_from_queryset(Leg)
+        self.assertEqual(len(manager.preloaded_objects[legs_hash]), len({v for el in self.data for v in el['legs']}))
+
 
 def get_id(count):
     return randint(1, count)